@@ -19,39 +19,83 @@ Usage:
 """
 
 import os
-import re
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
 from typing import Dict, List, Tuple, Optional
+from xml.sax.saxutils import escape
 
 # Note name to MIDI number mapping
 NOTE_MAP = {
     'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11
 }
 
+# Semitone offsets indexed by ord(letter) - ord('A'), for A..G
+_LETTER_SEMITONES = tuple(NOTE_MAP[letter] for letter in 'ABCDEFG')
+
+# Characters a filename must start with to possibly be a sample
+_NOTE_LETTERS = frozenset('ABCDEFGabcdefg')
+_NOTE_SECOND_CHARS = frozenset('#b-0123456789')
+
+# MIDI note number % 12 to note name
+_NOTE_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
 AUDIO_EXTENSIONS = {'.wav', '.aiff', '.aif', '.flac', '.mp3', '.ogg'}
 
+# Every common note spelling (either letter case, natural/sharp/flat,
+# octaves -1 to 9) precomputed so most lookups are a single dict hit
+_NOTE_TO_MIDI = {
+    f'{letter}{accidental}{octave}': semitone + offset + (octave + 1) * 12
+    for base, semitone in NOTE_MAP.items()
+    for letter in (base, base.lower())
+    for accidental, offset in (('', 0), ('#', 1), ('b', -1))
+    for octave in range(-1, 10)
+}
+
+# Names for the whole MIDI range, so midi_to_note is a list index
+_MIDI_TO_NOTE = [f"{_NOTE_NAMES[n % 12]}{(n // 12) - 1}" for n in range(128)]
+
 
 def note_to_midi(note_str: str) -> Optional[int]:
     """Convert note name (like C#2, Db3, A4) to MIDI note number."""
-    match = re.match(r'^([A-Ga-g])([#b]?)(-?\d+)$', note_str)
-    if not match:
-        return None
+    midi_note = _NOTE_TO_MIDI.get(note_str)
+    if midi_note is not None:
+        return midi_note
 
-    note_letter = match.group(1).upper()
-    accidental = match.group(2)
-    octave = int(match.group(3))
+    # Unusual spellings (e.g. C03, C10) and invalid names
+    return _parse_note(note_str)
 
-    midi_note = NOTE_MAP.get(note_letter)
-    if midi_note is None:
+
+def _parse_note(note_str: str) -> Optional[int]:
+    """Parse a note name that isn't in the precomputed table."""
+    # Plain string checks instead of a regex: {Letter}{#|b}?{-}?{digits}
+    if len(note_str) < 2:
         return None
 
+    index = ord(note_str[0]) - 65
+    if index >= 32:
+        index -= 32  # lowercase a-g
+    if not 0 <= index < 7:
+        return None
+    midi_note = _LETTER_SEMITONES[index]
+
     # Apply accidental
+    accidental = note_str[1]
     if accidental == '#':
         midi_note += 1
+        octave_str = note_str[2:]
     elif accidental == 'b':
         midi_note -= 1
+        octave_str = note_str[2:]
+    else:
+        octave_str = note_str[1:]
+
+    digits = octave_str[1:] if octave_str.startswith('-') else octave_str
+    if not digits.isdecimal():
+        return None
+    octave = int(octave_str)
 
     # MIDI note calculation: C4 = 60, so C0 = 12
     midi_note += (octave + 1) * 12
@@ -61,9 +105,11 @@ def note_to_midi(note_str: str) -> Optional[int]:
 
 def midi_to_note(midi_num: int) -> str:
     """Convert MIDI note number to note name."""
-    note_names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+    if 0 <= midi_num < 128:
+        return _MIDI_TO_NOTE[midi_num]
+
     octave = (midi_num // 12) - 1
-    note = note_names[midi_num % 12]
+    note = _NOTE_NAMES[midi_num % 12]
     return f"{note}{octave}"
 
 
@@ -75,24 +121,30 @@ def parse_filename(filename: str) -> Optional[Dict]:
 
     Returns dict with: note, midi_note, velocity, round_robin
     """
-    # Remove extension
-    name = Path(filename).stem
+    # Reject stray files on their first two characters before any splitting
+    if len(filename) < 2 or filename[0] not in _NOTE_LETTERS:
+        return None
+    second = filename[1]
+    if second not in _NOTE_SECOND_CHARS and not second.isdecimal():
+        return None
 
-    # Pattern: Note_Velocity_RR with optional _suffix (e.g., C3_033_01, F#4_127_02_piano)
-    pattern = r'^([A-Ga-g][#b]?-?\d+)_(\d+)_(\d+)(?:_.*)?$'
-    match = re.match(pattern, name, re.IGNORECASE)
+    # Remove extension
+    name = os.path.splitext(filename)[0]
 
-    if not match:
+    # Note_Velocity_RR with optional _suffix (e.g., C3_033_01, F#4_127_02_piano).
+    # The note token never contains '_', so a split is enough - no regex needed.
+    parts = name.split('_', 3)
+    if len(parts) < 3 or not parts[1].isdecimal() or not parts[2].isdecimal():
         return None
 
-    note_str = match.group(1)
-    velocity = int(match.group(2))
-    round_robin = int(match.group(3))
-
+    note_str = parts[0]
     midi_note = note_to_midi(note_str)
     if midi_note is None:
         return None
 
+    velocity = int(parts[1])
+    round_robin = int(parts[2])
+
     return {
         'note': note_str,
         'midi_note': midi_note,
@@ -123,20 +175,18 @@ def calculate_velocity_ranges(velocities: List[int]) -> Dict[int, Tuple[int, int
     if len(velocities) == 1:
         return {velocities[0]: (1, 127)}
 
-    ranges = {}
-    for i, vel in enumerate(velocities):
-        if i == 0:
-            low = 1
-        else:
-            # Start from previous velocity + 1
-            low = velocities[i-1] + 1
-
-        # High is always this velocity value (it's the ceiling)
-        high = vel
-
-        ranges[vel] = (low, high)
+    # Two or three layers is the common case
+    if len(velocities) == 2:
+        v0, v1 = velocities
+        return {v0: (1, v0), v1: (v0 + 1, v1)}
+    if len(velocities) == 3:
+        v0, v1, v2 = velocities
+        return {v0: (1, v0), v1: (v0 + 1, v1), v2: (v1 + 1, v2)}
 
-    return ranges
+    # Each layer starts one above the previous ceiling; the first starts at 1.
+    # High is always this velocity value (it's the ceiling)
+    lows = [1] + [vel + 1 for vel in velocities[:-1]]
+    return dict(zip(velocities, zip(lows, velocities)))
 
 
 def calculate_note_ranges(midi_notes: List[int]) -> Dict[int, Tuple[int, int]]:
@@ -155,108 +205,144 @@ def calculate_note_ranges(midi_notes: List[int]) -> Dict[int, Tuple[int, int]]:
         # Single sample covers all notes at or below it (pitched down only)
         return {midi_notes[0]: (0, midi_notes[0])}
 
-    ranges = {}
-    for i, note in enumerate(midi_notes):
-        if i == 0:
-            low = 0
-        else:
-            # Start from previous note + 1
-            low = midi_notes[i-1] + 1
+    if len(midi_notes) == 2:
+        n0, n1 = midi_notes
+        return {n0: (0, n0), n1: (n0 + 1, n1)}
+    if len(midi_notes) == 3:
+        n0, n1, n2 = midi_notes
+        return {n0: (0, n0), n1: (n0 + 1, n1), n2: (n1 + 1, n2)}
 
-        # End at this note's root (no pitching up ever)
-        high = note
+    # Each zone starts one above the previous root; the first starts at 0.
+    # End at this note's root (no pitching up ever)
+    lows = [0] + [note + 1 for note in midi_notes[:-1]]
+    return dict(zip(midi_notes, zip(lows, midi_notes)))
 
-        ranges[note] = (low, high)
 
-    return ranges
+def scan_samples(samples_dir: Path, jobs: int = 1) -> List[Dict]:
+    """
+    Scan directory for audio samples and parse their filenames.
 
+    With jobs > 1 the filenames are parsed in that many worker processes,
+    which only pays off for very large sample folders.
+    """
+    names = []
+
+    # scandir entries carry the file type from the directory read, so
+    # filtering doesn't cost an extra stat() per file
+    with os.scandir(samples_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+
+            name = entry.name
+            dot = name.rfind('.')
+            ext = name[dot:] if dot > 0 else ''
+            # Only lowercase when needed; most extensions already are
+            if ext not in AUDIO_EXTENSIONS and ext.lower() not in AUDIO_EXTENSIONS:
+                continue
+
+            names.append(name)
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(parse_filename, names, chunksize=256))
+    else:
+        results = map(parse_filename, names)
 
-def scan_samples(samples_dir: Path) -> List[Dict]:
-    """Scan directory for audio samples and parse their filenames."""
     samples = []
+    # Every sample lives directly in samples_dir, so its path relative to
+    # the instrument folder is always "<samples_dir name>/<file name>"
+    prefix = samples_dir.name + '/'
 
-    for file in samples_dir.iterdir():
-        if file.is_file() and file.suffix.lower() in AUDIO_EXTENSIONS:
-            parsed = parse_filename(file.name)
-            if parsed:
-                parsed['path'] = str(file.relative_to(samples_dir.parent))
-                samples.append(parsed)
-            else:
-                print(f"  Warning: Could not parse filename: {file.name}")
+    unparsed = []
+
+    for name, parsed in zip(names, results):
+        if parsed:
+            parsed['path'] = prefix + name
+            samples.append(parsed)
+        else:
+            unparsed.append(name)
+
+    # Report all bad names in one write rather than one print per file
+    if unparsed:
+        print(f"  Warning: Could not parse {len(unparsed)} filename(s):\n    "
+              + "\n    ".join(unparsed))
 
     return samples
 
 
-def generate_xml(samples: List[Dict], name: str, author: str, samples_folder: str = "samples") -> str:
-    """Generate instrument.sss XML content."""
+def generate_xml(samples: List[Dict], output_path: Path, name: str, author: str,
+                 samples_folder: str = "samples") -> None:
+    """Write instrument.sss XML for the given samples to output_path."""
 
     if not samples:
         raise ValueError("No valid samples found!")
 
-    # Group samples by note and velocity
-    # Structure: {midi_note: {velocity: [samples]}}
-    grouped = defaultdict(lambda: defaultdict(list))
-
-    for sample in samples:
-        grouped[sample['midi_note']][sample['velocity']].append(sample)
+    # One sort by (note, velocity, round robin) puts every zone's samples
+    # next to each other in order, so zones fall out of a single pass
+    ordered = sorted(samples, key=itemgetter('midi_note', 'velocity', 'round_robin'))
+    zones = [(zone, list(rr_samples))
+             for zone, rr_samples in groupby(ordered, key=itemgetter('midi_note', 'velocity'))]
 
     # Get all unique notes and velocities
-    all_notes = sorted(grouped.keys())
-    all_velocities = sorted(set(s['velocity'] for s in samples))
+    # Zones are already in note order, so dedupe without re-sorting
+    all_notes = list(dict.fromkeys(midi_note for (midi_note, _), _ in zones))
+    all_velocities = sorted({velocity for (_, velocity), _ in zones})
 
     # Calculate ranges
     note_ranges = calculate_note_ranges(all_notes)
     vel_ranges = calculate_velocity_ranges(all_velocities)
 
-    # Build XML
-    lines = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<SuperSimpleSampler version="1.0">',
-        '  <meta>',
-        f'    <name>{name}</name>',
-        f'    <author>{author}</author>',
-        '  </meta>',
-        '',
-        '  <samples>',
-    ]
-
-    # Add comment with stats
-    lines.append(f'    <!-- Generated from {len(samples)} sample files -->')
-    lines.append(f'    <!-- Notes: {midi_to_note(all_notes[0])} - {midi_to_note(all_notes[-1])} ({len(all_notes)} zones) -->')
-    lines.append(f'    <!-- Velocity layers: {len(all_velocities)} ({all_velocities}) -->')
-    lines.append('')
-
-    # Generate sample entries
-    for midi_note in all_notes:
-        note_low, note_high = note_ranges[midi_note]
-
-        for velocity in sorted(grouped[midi_note].keys()):
+    # Name, author and file names are user-supplied and may contain &, < or "
+    name = escape(name)
+    author = escape(author)
+    attr_entities = {'"': '&quot;'}
+
+    # Stream straight to the file rather than joining one big string
+    with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<SuperSimpleSampler version="1.0">\n'
+            '  <meta>\n'
+            f'    <name>{name}</name>\n'
+            f'    <author>{author}</author>\n'
+            '  </meta>\n'
+            '\n'
+            '  <samples>\n'
+        )
+
+        # Add comment with stats
+        f.write(
+            f'    <!-- Generated from {len(samples)} sample files -->\n'
+            f'    <!-- Notes: {midi_to_note(all_notes[0])} - {midi_to_note(all_notes[-1])} ({len(all_notes)} zones) -->\n'
+            f'    <!-- Velocity layers: {len(all_velocities)} ({all_velocities}) -->\n'
+            '\n'
+        )
+
+        # Generate sample entries
+        for (midi_note, velocity), rr_samples in zones:
+            note_low, note_high = note_ranges[midi_note]
             vel_low, vel_high = vel_ranges[velocity]
-
-            rr_samples = grouped[midi_note][velocity]
-            # Sort by round robin number
-            rr_samples.sort(key=lambda x: x['round_robin'])
+            note_name = midi_to_note(midi_note)
 
             # Add comment for this zone
-            note_name = midi_to_note(midi_note)
-            lines.append(f'    <!-- {note_name} vel{velocity} ({len(rr_samples)} round robins) -->')
+            f.write(f'    <!-- {note_name} vel{velocity} ({len(rr_samples)} round robins) -->\n')
 
             for sample in rr_samples:
                 # Path relative to instrument folder
-                rel_path = sample['path']
+                rel_path = escape(sample['path'], attr_entities)
 
-                line = f'    <sample file="{rel_path}" '
-                line += f'rootNote="{midi_note}" '
-                line += f'loNote="{note_low}" hiNote="{note_high}" '
-                line += f'loVel="{vel_low}" hiVel="{vel_high}"/>'
-                lines.append(line)
+                f.write(
+                    f'    <sample file="{rel_path}" '
+                    f'rootNote="{midi_note}" '
+                    f'loNote="{note_low}" hiNote="{note_high}" '
+                    f'loVel="{vel_low}" hiVel="{vel_high}"/>\n'
+                )
 
-            lines.append('')
+            f.write('\n')
 
-    lines.append('  </samples>')
-    lines.append('</SuperSimpleSampler>')
-
-    return '\n'.join(lines)
+        f.write('  </samples>\n'
+                '</SuperSimpleSampler>')
 
 
 def main():
@@ -282,6 +368,8 @@ Examples:
                         help='Author name')
     parser.add_argument('-o', '--output', type=str,
                         help='Output path for instrument.sss (default: samples_dir/../instrument.sss)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Worker processes for parsing filenames (default: 1)')
 
     args = parser.parse_args()
 
@@ -296,7 +384,7 @@ Examples:
         return 1
 
     print(f"Scanning: {samples_dir}")
-    samples = scan_samples(samples_dir)
+    samples = scan_samples(samples_dir, args.jobs)
 
     if not samples:
         print("Error: No valid sample files found!")
@@ -306,22 +394,19 @@ Examples:
 
     print(f"Found {len(samples)} valid samples")
 
-    # Generate XML
-    xml_content = generate_xml(samples, args.name, args.author)
-
     # Determine output path
     if args.output:
         output_path = Path(args.output)
     else:
         output_path = samples_dir.parent / 'instrument.sss'
 
-    # Write file
-    output_path.write_text(xml_content)
+    # Generate XML and write file
+    generate_xml(samples, output_path, args.name, args.author)
     print(f"Generated: {output_path}")
 
     # Summary
-    all_notes = sorted(set(s['midi_note'] for s in samples))
-    all_velocities = sorted(set(s['velocity'] for s in samples))
+    all_notes = sorted({s['midi_note'] for s in samples})
+    all_velocities = sorted({s['velocity'] for s in samples})
 
     print(f"\nInstrument Summary:")
     print(f"  Name: {args.name}")